@@ -1,17 +1,25 @@
 import os
+import io
 import sys
-import json
 import time
 import asyncio
 import sqlite3
+import zlib
+import queue
+import atexit
 import logging
+import logging.handlers
 import mimetypes
-from datetime import datetime, timedelta
+import itertools
+import functools
+import operator
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
 from enum import Enum
 from typing import List, Dict, Optional, Union, Any
 
 # Third-party libraries
-import nest_asyncio
+import orjson
 from dotenv import load_dotenv
 from mcp.server.fastmcp import FastMCP
 from telethon import TelegramClient, functions, utils
@@ -30,9 +38,32 @@ from telethon.tl.types import (
     InputPeerUser,
     InputPeerChat,
     InputPeerChannel,
+    InputDialogPeer,
+    InputMessagesFilterPinned,
+    InputMessagesFilterGif,
+    InputPhoneContact,
+    InputPeerNotifySettings,
+    InputPrivacyKeyStatusTimestamp,
+    InputPrivacyKeyPhoneNumber,
+    InputPrivacyKeyProfilePhoto,
+    InputPrivacyValueAllowUsers,
+    InputPrivacyValueDisallowUsers,
+    InputPrivacyValueAllowAll,
+    BotCommand,
+    BotCommandScopeDefault,
+    ChatForbidden,
+    ChannelForbidden,
 )
+from telethon.tl.functions.bots import SetBotCommandsRequest
+from telethon.tl.types.contacts import ContactsNotModified
 import telethon.errors.rpcerrorlist
 
+# Optional dependencies
+try:
+    import uvloop  # Faster event loop; not available on Windows
+except ImportError:
+    uvloop = None
+
 
 def json_serializer(obj):
     """Helper function to convert non-serializable objects for JSON serialization."""
@@ -53,14 +84,99 @@ TELEGRAM_SESSION_NAME = os.getenv("TELEGRAM_SESSION_NAME")
 # Check if a string session exists in environment, otherwise use file-based session
 SESSION_STRING = os.getenv("TELEGRAM_SESSION_STRING")
 
-mcp = FastMCP("telegram")
+# Maximum number of tool calls talking to Telegram at the same time
+TELEGRAM_MAX_CONCURRENCY = int(os.getenv("TELEGRAM_MAX_CONCURRENCY", "8"))
+# FLOOD_WAIT errors up to this many seconds are slept through and retried automatically
+TELEGRAM_FLOOD_SLEEP_THRESHOLD = int(os.getenv("TELEGRAM_FLOOD_SLEEP_THRESHOLD", "60"))
+# JSON tool output is compact unless indentation is asked for, to keep responses small
+TELEGRAM_PRETTY_JSON = os.getenv("TELEGRAM_PRETTY_JSON", "").lower() in ("1", "true", "yes")
+DUMPS_OPTIONS = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if TELEGRAM_PRETTY_JSON else 0)
+
+
+def dumps(obj) -> str:
+    """Helper function to serialize tool output to JSON using orjson."""
+    return orjson.dumps(obj, option=DUMPS_OPTIONS, default=json_serializer).decode()
+
+
+def dumps_list(items) -> str:
+    """
+    Helper function to serialize an iterable as a JSON array, one item at a time.
+
+    Produces the same text as dumps(list(items)) without holding the formatted
+    items and the encoded output in memory together.
+    """
+    buf = bytearray(b"[")
+    for item in items:
+        if len(buf) > 1:
+            buf += b","
+        encoded = orjson.dumps(item, option=DUMPS_OPTIONS, default=json_serializer)
+        if TELEGRAM_PRETTY_JSON:
+            # Strings escape their newlines, so every raw newline is indentation
+            buf += b"\n  "
+            encoded = encoded.replace(b"\n", b"\n  ")
+        buf += encoded
+    if TELEGRAM_PRETTY_JSON and len(buf) > 1:
+        buf += b"\n"
+    buf += b"]"
+    return buf.decode()
+
+
+class ThrottledFastMCP(FastMCP):
+    """FastMCP server that queues tool calls beyond a fixed concurrency limit."""
+
+    def __init__(self, *args, max_concurrency: int, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.call_semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def call_tool(self, *args, **kwargs):
+        # Bursts of parallel calls wait here instead of piling onto the single
+        # MTProto connection and tripping FLOOD_WAIT
+        async with self.call_semaphore:
+            return await super().call_tool(*args, **kwargs)
+
+
+mcp = ThrottledFastMCP("telegram", max_concurrency=TELEGRAM_MAX_CONCURRENCY)
 
 if SESSION_STRING:
     # Use the string session if available
-    client = TelegramClient(StringSession(SESSION_STRING), TELEGRAM_API_ID, TELEGRAM_API_HASH)
+    client = TelegramClient(
+        StringSession(SESSION_STRING),
+        TELEGRAM_API_ID,
+        TELEGRAM_API_HASH,
+        flood_sleep_threshold=TELEGRAM_FLOOD_SLEEP_THRESHOLD,
+    )
 else:
     # Use file-based session
-    client = TelegramClient(TELEGRAM_SESSION_NAME, TELEGRAM_API_ID, TELEGRAM_API_HASH)
+    client = TelegramClient(
+        TELEGRAM_SESSION_NAME,
+        TELEGRAM_API_ID,
+        TELEGRAM_API_HASH,
+        flood_sleep_threshold=TELEGRAM_FLOOD_SLEEP_THRESHOLD,
+    )
+
+# Read-only tools can spread their requests over several connections. Extra
+# clients reuse the string session; a file session cannot be shared safely.
+TELEGRAM_CLIENT_POOL_SIZE = max(1, int(os.getenv("TELEGRAM_CLIENT_POOL_SIZE", "1")))
+client_pool = [client]
+if SESSION_STRING:
+    client_pool += [
+        TelegramClient(
+            StringSession(SESSION_STRING),
+            TELEGRAM_API_ID,
+            TELEGRAM_API_HASH,
+            flood_sleep_threshold=TELEGRAM_FLOOD_SLEEP_THRESHOLD,
+            # Only the main client handles updates; the pool just sends requests
+            receive_updates=False,
+        )
+        for _ in range(TELEGRAM_CLIENT_POOL_SIZE - 1)
+    ]
+client_cycle = itertools.cycle(client_pool)
+
+
+def next_client() -> TelegramClient:
+    """Pick the next pooled client, round-robin, for a read-only request."""
+    return next(client_cycle)
+
 
 # Setup robust logging with both file and console output
 logger = logging.getLogger("telegram_mcp")
@@ -74,27 +190,37 @@ console_handler.setLevel(logging.ERROR)  # Set to ERROR for production, INFO for
 script_dir = os.path.dirname(os.path.abspath(__file__))
 log_file_path = os.path.join(script_dir, "mcp_errors.log")
 
+# The logger only enqueues records; a listener thread does the blocking writes
+# so logging an error never stalls the event loop
+log_queue = queue.SimpleQueue()
+log_handlers = [console_handler]
+
+formatter = logging.Formatter(
+    "%(asctime)s [%(levelname)s] %(name)s - %(message)s - %(filename)s:%(lineno)d"
+)
+console_handler.setFormatter(formatter)
+
 try:
     file_handler = logging.FileHandler(log_file_path, mode="a")  # Append mode
     file_handler.setLevel(logging.ERROR)
-
-    # Create formatter and add to handlers
-    formatter = logging.Formatter(
-        "%(asctime)s [%(levelname)s] %(name)s - %(message)s - %(filename)s:%(lineno)d"
-    )
-    console_handler.setFormatter(formatter)
     file_handler.setFormatter(formatter)
-
-    # Add handlers to logger
-    logger.addHandler(console_handler)
-    logger.addHandler(file_handler)
-
-    logger.info(f"Logging initialized to {log_file_path}")
+    log_handlers.append(file_handler)
+    log_file_error = None
 except Exception as log_error:
     print(f"WARNING: Error setting up log file: {log_error}")
     # Fallback to console-only logging
-    logger.addHandler(console_handler)
-    logger.error(f"Failed to set up log file handler: {log_error}")
+    log_file_error = log_error
+
+logger.addHandler(logging.handlers.QueueHandler(log_queue))
+log_listener = logging.handlers.QueueListener(log_queue, *log_handlers, respect_handler_level=True)
+log_listener.start()
+# Flush pending records on shutdown
+atexit.register(log_listener.stop)
+
+if log_file_error is None:
+    logger.info(f"Logging initialized to {log_file_path}")
+else:
+    logger.error(f"Failed to set up log file handler: {log_file_error}")
 
 # Error code prefix mapping for better error tracing
 
@@ -110,6 +236,101 @@ class ErrorCategory(str, Enum):
     ADMIN = "ADMIN"
 
 
+# Error code prefix for each tool; tools not listed fall back to GEN
+TOOL_ERROR_CATEGORIES: Dict[str, ErrorCategory] = {
+    "archive_chat": ErrorCategory.CHAT,
+    "unarchive_chat": ErrorCategory.CHAT,
+    "mute_chat": ErrorCategory.CHAT,
+    "unmute_chat": ErrorCategory.CHAT,
+    "mark_as_read": ErrorCategory.CHAT,
+    "get_chat": ErrorCategory.CHAT,
+    "get_chats": ErrorCategory.CHAT,
+    "list_chats": ErrorCategory.CHAT,
+    "get_contact_chats": ErrorCategory.CHAT,
+    "get_direct_chat_by_contact": ErrorCategory.CHAT,
+    "search_public_chats": ErrorCategory.CHAT,
+    "resolve_username": ErrorCategory.CHAT,
+    "edit_chat_title": ErrorCategory.CHAT,
+    "edit_chat_photo": ErrorCategory.CHAT,
+    "delete_chat_photo": ErrorCategory.CHAT,
+    "leave_chat": ErrorCategory.CHAT,
+    "get_invite_link": ErrorCategory.CHAT,
+    "export_chat_invite": ErrorCategory.CHAT,
+    "import_chat_invite": ErrorCategory.CHAT,
+    "join_chat_by_link": ErrorCategory.CHAT,
+    "get_messages": ErrorCategory.MSG,
+    "list_messages": ErrorCategory.MSG,
+    "get_history": ErrorCategory.MSG,
+    "get_message_context": ErrorCategory.MSG,
+    "get_last_interaction": ErrorCategory.MSG,
+    "get_pinned_messages": ErrorCategory.MSG,
+    "search_messages": ErrorCategory.MSG,
+    "send_message": ErrorCategory.MSG,
+    "reply_to_message": ErrorCategory.MSG,
+    "edit_message": ErrorCategory.MSG,
+    "delete_message": ErrorCategory.MSG,
+    "forward_message": ErrorCategory.MSG,
+    "pin_message": ErrorCategory.MSG,
+    "unpin_message": ErrorCategory.MSG,
+    "list_contacts": ErrorCategory.CONTACT,
+    "search_contacts": ErrorCategory.CONTACT,
+    "get_contact_ids": ErrorCategory.CONTACT,
+    "export_contacts": ErrorCategory.CONTACT,
+    "add_contact": ErrorCategory.CONTACT,
+    "delete_contact": ErrorCategory.CONTACT,
+    "import_contacts": ErrorCategory.CONTACT,
+    "block_user": ErrorCategory.CONTACT,
+    "unblock_user": ErrorCategory.CONTACT,
+    "get_blocked_users": ErrorCategory.CONTACT,
+    "create_group": ErrorCategory.GROUP,
+    "create_channel": ErrorCategory.GROUP,
+    "invite_to_group": ErrorCategory.GROUP,
+    "get_participants": ErrorCategory.GROUP,
+    "download_media": ErrorCategory.MEDIA,
+    "get_media_info": ErrorCategory.MEDIA,
+    "send_file": ErrorCategory.MEDIA,
+    "send_voice": ErrorCategory.MEDIA,
+    "send_sticker": ErrorCategory.MEDIA,
+    "send_gif": ErrorCategory.MEDIA,
+    "get_gif_search": ErrorCategory.MEDIA,
+    "get_sticker_sets": ErrorCategory.MEDIA,
+    "get_me": ErrorCategory.PROFILE,
+    "update_profile": ErrorCategory.PROFILE,
+    "set_profile_photo": ErrorCategory.PROFILE,
+    "delete_profile_photo": ErrorCategory.PROFILE,
+    "get_user_photos": ErrorCategory.PROFILE,
+    "get_user_status": ErrorCategory.PROFILE,
+    "get_privacy_settings": ErrorCategory.PROFILE,
+    "set_privacy_settings": ErrorCategory.PROFILE,
+    "promote_admin": ErrorCategory.ADMIN,
+    "demote_admin": ErrorCategory.ADMIN,
+    "get_admins": ErrorCategory.ADMIN,
+    "ban_user": ErrorCategory.ADMIN,
+    "unban_user": ErrorCategory.ADMIN,
+    "get_banned_users": ErrorCategory.ADMIN,
+    "get_recent_actions": ErrorCategory.ADMIN,
+}
+
+# Error codes computed so far, keyed by (function_name, prefix)
+ERROR_CODES: Dict[tuple, str] = {}
+
+
+def get_error_code(function_name: str, prefix: Optional[ErrorCategory] = None) -> str:
+    """Return the error code for a function, deriving it only on first use."""
+    key = (function_name, prefix)
+    error_code = ERROR_CODES.get(key)
+    if error_code is None:
+        if prefix is None:
+            prefix = TOOL_ERROR_CATEGORIES.get(function_name)
+
+        prefix_str = prefix.value if prefix else "GEN"
+
+        # crc32 is stable across restarts, unlike the salted built-in hash()
+        error_code = f"{prefix_str}-ERR-{zlib.crc32(function_name.encode()) % 1000:03d}"
+        ERROR_CODES[key] = error_code
+    return error_code
+
+
 def log_and_format_error(
     function_name: str,
     error: Exception,
@@ -125,27 +346,22 @@ def log_and_format_error(
         function_name: Name of the function where the error occurred.
         error: The exception that was raised.
         prefix: Error code prefix (e.g., "CHAT", "MSG").
-            If None, it will be derived from the function_name.
+            If None, it is looked up in TOOL_ERROR_CATEGORIES.
         **kwargs: Additional context parameters to include in the log.
 
     Returns:
         A user-friendly error message with an error code.
     """
     # Generate a consistent error code
-    if prefix is None:
-        # Try to derive prefix from function name
-        for category in ErrorCategory:
-            if category.name.lower() in function_name.lower():
-                prefix = category
-                break
-
-    prefix_str = prefix.value if prefix else "GEN"
-
-    error_code = f"{prefix_str}-ERR-{abs(hash(function_name)) % 1000:03d}"
+    error_code = get_error_code(function_name, prefix)
 
     # Format the additional context parameters
     context = ", ".join(f"{k}={v}" for k, v in kwargs.items())
 
+    # A cached peer may have gone stale; force fresh lookups from now on
+    if isinstance(error, telethon.errors.rpcerrorlist.PeerIdInvalidError):
+        entity_cache.clear()
+
     # Log the full technical error
     logger.exception(f"{function_name} failed ({context}): {error}")
 
@@ -153,25 +369,239 @@ def log_and_format_error(
     return f"An error occurred (code: {error_code}). " f"Check mcp_errors.log for details."
 
 
+class TTLCache:
+    """
+    Minimal in-process cache whose entries expire after ``ttl`` seconds.
+
+    When ``maxsize`` is set, the least recently used entry is evicted once full.
+    """
+
+    def __init__(self, ttl: float, maxsize: Optional[int] = None):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Any, tuple]" = OrderedDict()
+
+    def get(self, key, default=None):
+        item = self._data.get(key)
+        if item is None:
+            return default
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return default
+        if self.maxsize is not None:
+            self._data.move_to_end(key)
+        return value
+
+    def set(self, key, value) -> None:
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        if self.maxsize is not None:
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def pop(self, key, default=None):
+        item = self._data.pop(key, None)
+        return default if item is None else item[1]
+
+    def clear(self) -> None:
+        self._data.clear()
+
+
+# Resolved entities, keyed by the identifier the tool was called with
+ENTITY_CACHE_TTL = 300
+entity_cache = TTLCache(ttl=ENTITY_CACHE_TTL, maxsize=512)
+entity_locks: Dict[Any, asyncio.Lock] = {}
+
+
+async def resolve_entity(chat_id):
+    """
+    Resolve a chat/user identifier to an entity, reusing recent lookups.
+
+    Concurrent misses for the same identifier share a single get_entity call.
+    """
+    entity = entity_cache.get(chat_id)
+    if entity is not None:
+        return entity
+
+    lock = entity_locks.setdefault(chat_id, asyncio.Lock())
+    async with lock:
+        try:
+            entity = entity_cache.get(chat_id)
+            if entity is None:
+                entity = await client.get_entity(chat_id)
+                entity_cache.set(chat_id, entity)
+        finally:
+            # Only after the cache is filled, and never a newer caller's lock
+            if entity_locks.get(chat_id) is lock:
+                del entity_locks[chat_id]
+    return entity
+
+
+def invalidate_entity(chat_id) -> None:
+    """Drop a cached entity after a tool changes it, so the next lookup is fresh."""
+    entity_cache.pop(chat_id)
+
+
+async def get_peer_dialogs(entities) -> Dict[int, Any]:
+    """Fetch the dialogs for the given peers in a single request, keyed by peer ID."""
+    if not entities:
+        return {}
+    result = await client(
+        functions.messages.GetPeerDialogsRequest(
+            peers=[InputDialogPeer(peer=utils.get_input_peer(e)) for e in entities]
+        )
+    )
+    return {utils.get_peer_id(d.peer): d for d in result.dialogs}
+
+
+@functools.lru_cache(maxsize=256)
+def parse_date(value: str) -> datetime:
+    """Parse a YYYY-MM-DD string into a UTC-aware datetime at midnight."""
+    return datetime.strptime(value, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+
+
+def get_telegram_hash(ids) -> int:
+    """Compute Telegram's 64-bit caching hash over a sequence of IDs."""
+    value = 0
+    for item in ids:
+        value ^= value >> 21
+        value ^= (value << 35) & 0xFFFFFFFFFFFFFFFF
+        value ^= value >> 4
+        value = (value + item) & 0xFFFFFFFFFFFFFFFF
+    # The API expects a signed 64-bit integer
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+# Last contact list returned by Telegram, reused while the server reports no change
+contacts_hash = 0
+contacts_cache: List[Any] = []
+
+
+async def get_contacts() -> List[Any]:
+    """Return the account's contacts, skipping the download when nothing changed."""
+    global contacts_hash, contacts_cache
+    result = await next_client()(functions.contacts.GetContactsRequest(hash=contacts_hash))
+    if isinstance(result, ContactsNotModified):
+        return contacts_cache
+    contacts_cache = result.users
+    # Telegram hashes saved_count first, then the sorted contact user IDs
+    contacts_hash = get_telegram_hash(
+        [result.saved_count, *sorted(contact.user_id for contact in result.contacts)]
+    )
+    return contacts_cache
+
+
+async def get_full_chat(reader: TelegramClient, entity) -> Any:
+    """Helper function to fetch the full info of a group or channel in one request."""
+    if isinstance(entity, Channel):
+        full = await reader(functions.channels.GetFullChannelRequest(entity))
+    else:
+        full = await reader(functions.messages.GetFullChatRequest(entity.id))
+    return full.full_chat
+
+
+async def export_invite(entity) -> Optional[str]:
+    """
+    Helper function to get an invite link for a group or channel.
+
+    Falls back to the chat's current link from its full info when exporting
+    a new one is refused, and returns None if neither is available.
+    """
+    try:
+        result = await client(functions.messages.ExportChatInviteRequest(peer=entity))
+        return result.link
+    except telethon.errors.rpcerrorlist.RPCError as export_err:
+        logger.warning(f"ExportChatInviteRequest failed: {export_err}")
+
+    if not isinstance(entity, (Chat, Channel)):
+        return None
+    full_chat = await get_full_chat(client, entity)
+    return getattr(full_chat.exported_invite, "link", None)
+
+
+# Groups and channels shared with a user, keyed by user ID
+common_chats_cache = TTLCache(ttl=300, maxsize=1024)
+
+
+async def get_common_chats(user) -> List[Any]:
+    """Return the chats shared with a user, reusing a recent answer when available."""
+    chats = common_chats_cache.get(user.id)
+    if chats is None:
+        result = await next_client()(
+            functions.messages.GetCommonChatsRequest(user_id=user, max_id=0, limit=100)
+        )
+        chats = result.chats
+        common_chats_cache.set(user.id, chats)
+    return chats
+
+
+# Reads both name fields of a User in a single C-level call
+get_user_names = operator.attrgetter("first_name", "last_name")
+
+
+# Stop participant listings at about 1 MB of text so a huge channel cannot exhaust memory
+PARTICIPANTS_OUTPUT_LIMIT = 1024 * 1024
+
+
+async def format_participants(chat_id, filter=None) -> str:
+    """Helper function to stream participants into one line each, up to the output limit."""
+    entity = await resolve_entity(chat_id)
+    out = io.StringIO()
+    # Bound once instead of looked up on every row
+    write, tell = out.write, out.tell
+    async for p in next_client().iter_participants(entity, filter=filter):
+        size = tell()
+        if size:
+            if size >= PARTICIPANTS_OUTPUT_LIMIT:
+                write("\n... truncated (output limit reached)")
+                break
+            write("\n")
+        first_name, last_name = get_user_names(p)
+        write(f"ID: {p.id}, Name: {first_name or ''} {last_name or ''}".strip())
+    return out.getvalue()
+
+
+# Entity classes that carry a title rather than a first/last name
+TITLED_ENTITY_TYPES = frozenset((Chat, ChatForbidden, Channel, ChannelForbidden))
+
+
+def format_user_entity(entity, result: Dict[str, Any]) -> None:
+    first_name, last_name = get_user_names(entity)
+    result["name"] = " ".join(part for part in (first_name, last_name) if part)
+    result["type"] = "user"
+    if entity.username:
+        result["username"] = entity.username
+    if entity.phone:
+        result["phone"] = entity.phone
+
+
+def format_group_entity(entity, result: Dict[str, Any]) -> None:
+    result["name"] = entity.title
+    result["type"] = "group"
+
+
+def format_channel_entity(entity, result: Dict[str, Any]) -> None:
+    result["name"] = entity.title
+    result["type"] = "channel"
+
+
+ENTITY_FORMATTERS = {
+    User: format_user_entity,
+    Chat: format_group_entity,
+    ChatForbidden: format_group_entity,
+    Channel: format_channel_entity,
+    ChannelForbidden: format_channel_entity,
+}
+
+
 def format_entity(entity) -> Dict[str, Any]:
     """Helper function to format entity information consistently."""
     result = {"id": entity.id}
 
-    if hasattr(entity, "title"):
-        result["name"] = entity.title
-        result["type"] = "group" if isinstance(entity, Chat) else "channel"
-    elif hasattr(entity, "first_name"):
-        name_parts = []
-        if entity.first_name:
-            name_parts.append(entity.first_name)
-        if hasattr(entity, "last_name") and entity.last_name:
-            name_parts.append(entity.last_name)
-        result["name"] = " ".join(name_parts)
-        result["type"] = "user"
-        if hasattr(entity, "username") and entity.username:
-            result["username"] = entity.username
-        if hasattr(entity, "phone") and entity.phone:
-            result["phone"] = entity.phone
+    formatter = ENTITY_FORMATTERS.get(entity.__class__)
+    if formatter is not None:
+        formatter(entity, result)
 
     return result
 
@@ -194,22 +624,163 @@ def format_message(message) -> Dict[str, Any]:
     return result
 
 
+def get_user_name(sender) -> str:
+    first_name, last_name = get_user_names(sender)
+    return " ".join(part for part in (first_name, last_name) if part) or "Unknown"
+
+
+def get_title_name(sender) -> str:
+    return sender.title or "Unknown"
+
+
+SENDER_NAME_GETTERS = {
+    User: get_user_name,
+    Chat: get_title_name,
+    ChatForbidden: get_title_name,
+    Channel: get_title_name,
+    ChannelForbidden: get_title_name,
+}
+
+
 def get_sender_name(message) -> str:
     """Helper function to get sender name from a message."""
-    if not message.sender:
+    sender = message.sender
+    if not sender:
         return "Unknown"
 
-    # Check for group/channel title first
-    if hasattr(message.sender, "title") and message.sender.title:
-        return message.sender.title
-    elif hasattr(message.sender, "first_name"):
-        # User sender
-        first_name = getattr(message.sender, "first_name", "") or ""
-        last_name = getattr(message.sender, "last_name", "") or ""
-        full_name = f"{first_name} {last_name}".strip()
-        return full_name if full_name else "Unknown"
-    else:
-        return "Unknown"
+    getter = SENDER_NAME_GETTERS.get(sender.__class__)
+    return getter(sender) if getter is not None else "Unknown"
+
+
+def get_reply_id(msg) -> Optional[int]:
+    """Helper function to get the ID of the message a message replies to, if any."""
+    # Story replies carry a reply header without reply_to_msg_id
+    return getattr(msg.reply_to, "reply_to_msg_id", None)
+
+
+def write_message_line(write, msg, text) -> None:
+    """
+    Helper function to write a message as a single listing line, piece by piece.
+
+    ``write`` is a bound ``StringIO.write``, so callers pay the method lookup once.
+    """
+    write("ID: ")
+    write(str(msg.id))
+    write(" | ")
+    write(get_sender_name(msg))
+    write(" | Date: ")
+    write(str(msg.date))
+    reply_id = get_reply_id(msg)
+    if reply_id:
+        write(" | reply to ")
+        write(str(reply_id))
+    write(" | Message: ")
+    write(str(text))
+
+
+def format_message_lines(messages, placeholder: Optional[str] = None) -> str:
+    """
+    Helper function to render messages as newline-separated listing lines.
+
+    Messages without text show ``placeholder`` when given, otherwise ``None``.
+    """
+    out = io.StringIO()
+    write, tell = out.write, out.tell
+    for msg in messages:
+        if tell():
+            write("\n")
+        write_message_line(
+            write, msg, (msg.message or placeholder) if placeholder else msg.message
+        )
+    return out.getvalue()
+
+
+async def stream_message_lines(messages, placeholder: Optional[str] = None) -> str:
+    """Helper function like format_message_lines that writes each message as it arrives."""
+    out = io.StringIO()
+    write, tell = out.write, out.tell
+    async for msg in messages:
+        if tell():
+            write("\n")
+        write_message_line(
+            write, msg, (msg.message or placeholder) if placeholder else msg.message
+        )
+    return out.getvalue()
+
+
+def format_contact_line(user) -> str:
+    """Helper function to render a contact as a single listing line."""
+    first_name, last_name = get_user_names(user)
+    name = f"{first_name or ''} {last_name or ''}".strip()
+    username = user.username
+    phone = user.phone
+    contact_info = f"ID: {user.id}, Name: {name}"
+    if username:
+        contact_info += f", Username: @{username}"
+    if phone:
+        contact_info += f", Phone: {phone}"
+    return contact_info
+
+
+CHAT_TYPES = {User: "user", Chat: "group"}
+
+
+def get_chat_type(entity) -> Optional[str]:
+    """Helper function to classify an entity as 'user', 'group' or 'channel'."""
+    cls = entity.__class__
+    if cls is Channel:
+        return "channel" if entity.broadcast else "group"  # Supergroup
+    return CHAT_TYPES.get(cls)
+
+
+def get_chat_title(entity) -> str:
+    """Helper function to get a chat's title, falling back to the user's first name."""
+    cls = entity.__class__
+    title = entity.title if cls in TITLED_ENTITY_TYPES else None
+    return title or (entity.first_name if cls is User else "Unknown")
+
+
+def format_chat_line(dialog, chat_type) -> str:
+    """Helper function to render a dialog as a single listing line."""
+    entity = dialog.entity
+    cls = entity.__class__
+    chat_info = f"Chat ID: {entity.id}"
+
+    if cls in TITLED_ENTITY_TYPES:
+        chat_info += f", Title: {entity.title}"
+    elif cls is User:
+        first_name, last_name = entity.first_name, entity.last_name
+        name = f"{first_name} {last_name}" if last_name else f"{first_name}"
+        chat_info += f", Name: {name}"
+
+    chat_info += f", Type: {chat_type}"
+
+    username = getattr(entity, "username", None)
+    if username:
+        chat_info += f", Username: @{username}"
+
+    # Add unread count if available
+    unread_count = dialog.unread_count
+    if unread_count > 0:
+        chat_info += f", Unread: {unread_count}"
+
+    return chat_info
+
+
+def format_direct_chat_line(contact, dialog) -> str:
+    """Helper function to render a contact's private dialog as a single listing line."""
+    first_name, last_name = get_user_names(contact)
+    contact_name = f"{first_name or ''} {last_name or ''}".strip()
+    chat_info = f"Chat ID: {contact.id}, Contact: {contact_name}"
+    if contact.username:
+        chat_info += f", Username: @{contact.username}"
+    if dialog.unread_count:
+        chat_info += f", Unread: {dialog.unread_count}"
+    return chat_info
+
+
+# Where the next page of get_chats starts, keyed by (page_size, page)
+dialog_cursors = TTLCache(ttl=60, maxsize=64)
 
 
 @mcp.tool()
@@ -221,19 +792,37 @@ async def get_chats(page: int = 1, page_size: int = 20) -> str:
         page_size: Number of chats per page.
     """
     try:
-        dialogs = await client.get_dialogs()
+        reader = next_client()
         start = (page - 1) * page_size
         end = start + page_size
-        if start >= len(dialogs):
+        cursor = dialog_cursors.get((page_size, page))
+        if cursor is not None:
+            # Continue right after the last dialog of the previous page
+            offset_date, offset_id, offset_peer = cursor
+            chats = await reader.get_dialogs(
+                limit=page_size,
+                offset_date=offset_date,
+                offset_id=offset_id,
+                offset_peer=offset_peer,
+            )
+        else:
+            # Fetch only as many dialogs as this page needs, not the whole list
+            dialogs = await reader.get_dialogs(limit=end)
+            chats = dialogs[start:end]
+        if not chats:
             return "Page out of range."
-        chats = dialogs[start:end]
-        lines = []
-        for dialog in chats:
-            entity = dialog.entity
-            chat_id = entity.id
-            title = getattr(entity, "title", None) or getattr(entity, "first_name", "Unknown")
-            lines.append(f"Chat ID: {chat_id}, Title: {title}")
-        return "\n".join(lines)
+
+        # Pinned dialogs are not in date order, so they cannot anchor a cursor
+        last = chats[-1]
+        if len(chats) == page_size and last.message is not None and not last.pinned:
+            dialog_cursors.set(
+                (page_size, page + 1), (last.message.date, last.message.id, last.input_entity)
+            )
+
+        return "\n".join(
+            f"Chat ID: {dialog.entity.id}, Title: {get_chat_title(dialog.entity)}"
+            for dialog in chats
+        )
     except Exception as e:
         return log_and_format_error("get_chats", e)
 
@@ -248,21 +837,13 @@ async def get_messages(chat_id: int, page: int = 1, page_size: int = 20) -> str:
         page_size: Number of messages per page.
     """
     try:
-        entity = await client.get_entity(chat_id)
+        entity = await resolve_entity(chat_id)
+        reader = next_client()
         offset = (page - 1) * page_size
-        messages = await client.get_messages(entity, limit=page_size, add_offset=offset)
+        messages = await reader.get_messages(entity, limit=page_size, add_offset=offset)
         if not messages:
             return "No messages found for this page."
-        lines = []
-        for msg in messages:
-            sender_name = get_sender_name(msg)
-            reply_info = ""
-            if msg.reply_to and msg.reply_to.reply_to_msg_id:
-                reply_info = f" | reply to {msg.reply_to.reply_to_msg_id}"
-            lines.append(
-                f"ID: {msg.id} | {sender_name} | Date: {msg.date}{reply_info} | Message: {msg.message}"
-            )
-        return "\n".join(lines)
+        return format_message_lines(messages)
     except Exception as e:
         return log_and_format_error(
             "get_messages", e, chat_id=chat_id, page=page, page_size=page_size
@@ -278,7 +859,7 @@ async def send_message(chat_id: int, message: str) -> str:
         message: The message content to send.
     """
     try:
-        entity = await client.get_entity(chat_id)
+        entity = await resolve_entity(chat_id)
         await client.send_message(entity, message)
         return "Message sent successfully."
     except Exception as e:
@@ -291,22 +872,10 @@ async def list_contacts() -> str:
     List all contacts in your Telegram account.
     """
     try:
-        result = await client(functions.contacts.GetContactsRequest(hash=0))
-        users = result.users
+        users = await get_contacts()
         if not users:
             return "No contacts found."
-        lines = []
-        for user in users:
-            name = f"{getattr(user, 'first_name', '')} {getattr(user, 'last_name', '')}".strip()
-            username = getattr(user, "username", "")
-            phone = getattr(user, "phone", "")
-            contact_info = f"ID: {user.id}, Name: {name}"
-            if username:
-                contact_info += f", Username: @{username}"
-            if phone:
-                contact_info += f", Phone: {phone}"
-            lines.append(contact_info)
-        return "\n".join(lines)
+        return "\n".join(format_contact_line(user) for user in users)
     except Exception as e:
         return log_and_format_error("list_contacts", e)
 
@@ -323,18 +892,7 @@ async def search_contacts(query: str) -> str:
         users = result.users
         if not users:
             return f"No contacts found matching '{query}'."
-        lines = []
-        for user in users:
-            name = f"{getattr(user, 'first_name', '')} {getattr(user, 'last_name', '')}".strip()
-            username = getattr(user, "username", "")
-            phone = getattr(user, "phone", "")
-            contact_info = f"ID: {user.id}, Name: {name}"
-            if username:
-                contact_info += f", Username: @{username}"
-            if phone:
-                contact_info += f", Phone: {phone}"
-            lines.append(contact_info)
-        return "\n".join(lines)
+        return "\n".join(format_contact_line(user) for user in users)
     except Exception as e:
         return log_and_format_error("search_contacts", e, query=query)
 
@@ -345,7 +903,8 @@ async def get_contact_ids() -> str:
     Get all contact IDs in your Telegram account.
     """
     try:
-        result = await client(functions.contacts.GetContactIDsRequest(hash=0))
+        # IDs only: much smaller than the full user objects get_contacts() returns
+        result = await next_client()(functions.contacts.GetContactIDsRequest(hash=0))
         if not result:
             return "No contact IDs found."
         return "Contact IDs: " + ", ".join(str(cid) for cid in result)
@@ -372,53 +931,39 @@ async def list_messages(
         to_date: Filter messages until this date (format: YYYY-MM-DD).
     """
     try:
-        entity = await client.get_entity(chat_id)
-
-        # Parse date filters if provided
+        # Parse date filters first so a bad date never costs a request
         from_date_obj = None
         to_date_obj = None
 
         if from_date:
             try:
-                from_date_obj = datetime.strptime(from_date, "%Y-%m-%d")
-                # Make it timezone aware by adding UTC timezone info
-                # Use datetime.timezone.utc for Python 3.9+ or import timezone directly for 3.13+
-                try:
-                    # For Python 3.9+
-                    from_date_obj = from_date_obj.replace(tzinfo=datetime.timezone.utc)
-                except AttributeError:
-                    # For Python 3.13+
-                    from datetime import timezone
-
-                    from_date_obj = from_date_obj.replace(tzinfo=timezone.utc)
+                from_date_obj = parse_date(from_date)
             except ValueError:
                 return f"Invalid from_date format. Use YYYY-MM-DD."
 
         if to_date:
             try:
-                to_date_obj = datetime.strptime(to_date, "%Y-%m-%d")
-                # Set to end of day and make timezone aware
-                to_date_obj = to_date_obj + timedelta(days=1, microseconds=-1)
-                # Add timezone info
-                try:
-                    to_date_obj = to_date_obj.replace(tzinfo=datetime.timezone.utc)
-                except AttributeError:
-                    from datetime import timezone
-
-                    to_date_obj = to_date_obj.replace(tzinfo=timezone.utc)
+                # Set to end of day
+                to_date_obj = parse_date(to_date) + timedelta(days=1, microseconds=-1)
             except ValueError:
                 return f"Invalid to_date format. Use YYYY-MM-DD."
 
+        entity = await resolve_entity(chat_id)
+        reader = next_client()
+
         # Prepare filter parameters
         params = {}
         if search_query:
-            # IMPORTANT: Do not combine offset_date with search.
-            # Use server-side search alone, then enforce date bounds client-side.
             params["search"] = search_query
+            if to_date_obj:
+                # For searches Telethon sends offset_date as messages.Search max_date,
+                # which only returns messages sent strictly before it; +1µs rounds to
+                # the next midnight, so the server alone enforces the upper bound
+                params["offset_date"] = to_date_obj + timedelta(microseconds=1)
             messages = []
-            async for msg in client.iter_messages(entity, **params):  # newest -> oldest
-                if to_date_obj and msg.date > to_date_obj:
-                    continue
+            async for msg in reader.iter_messages(entity, **params):  # newest -> oldest
+                # Results arrive newest first, so the first message before from_date
+                # ends the scan without a server-side min_date
                 if from_date_obj and msg.date < from_date_obj:
                     break
                 messages.append(msg)
@@ -432,7 +977,7 @@ async def list_messages(
                 messages = []
                 if from_date_obj:
                     # Walk forward from start date (oldest -> newest)
-                    async for msg in client.iter_messages(
+                    async for msg in reader.iter_messages(
                         entity, offset_date=from_date_obj, reverse=True
                     ):
                         if to_date_obj and msg.date > to_date_obj:
@@ -444,7 +989,7 @@ async def list_messages(
                             break
                 else:
                     # Only upper bound: walk backward from end bound
-                    async for msg in client.iter_messages(
+                    async for msg in reader.iter_messages(
                         # offset_date is exclusive; +1µs makes to_date inclusive
                         entity,
                         offset_date=to_date_obj + timedelta(microseconds=1),
@@ -453,24 +998,12 @@ async def list_messages(
                         if len(messages) >= limit:
                             break
             else:
-                messages = await client.get_messages(entity, limit=limit, **params)
+                messages = await reader.get_messages(entity, limit=limit, **params)
 
         if not messages:
             return "No messages found matching the criteria."
 
-        lines = []
-        for msg in messages:
-            sender_name = get_sender_name(msg)
-            message_text = msg.message or "[Media/No text]"
-            reply_info = ""
-            if msg.reply_to and msg.reply_to.reply_to_msg_id:
-                reply_info = f" | reply to {msg.reply_to.reply_to_msg_id}"
-
-            lines.append(
-                f"ID: {msg.id} | {sender_name} | Date: {msg.date}{reply_info} | Message: {message_text}"
-            )
-
-        return "\n".join(lines)
+        return format_message_lines(messages, "[Media/No text]")
     except Exception as e:
         return log_and_format_error("list_messages", e, chat_id=chat_id)
 
@@ -487,51 +1020,19 @@ async def list_chats(chat_type: str = None, limit: int = 20) -> str:
     try:
         dialogs = await client.get_dialogs(limit=limit)
 
-        results = []
-        for dialog in dialogs:
-            entity = dialog.entity
-
-            # Filter by type if requested
-            current_type = None
-            if isinstance(entity, User):
-                current_type = "user"
-            elif isinstance(entity, Chat):
-                current_type = "group"
-            elif isinstance(entity, Channel):
-                if getattr(entity, "broadcast", False):
-                    current_type = "channel"
-                else:
-                    current_type = "group"  # Supergroup
-
-            if chat_type and current_type != chat_type.lower():
-                continue
-
-            # Format chat info
-            chat_info = f"Chat ID: {entity.id}"
-
-            if hasattr(entity, "title"):
-                chat_info += f", Title: {entity.title}"
-            elif hasattr(entity, "first_name"):
-                name = f"{entity.first_name}"
-                if hasattr(entity, "last_name") and entity.last_name:
-                    name += f" {entity.last_name}"
-                chat_info += f", Name: {name}"
-
-            chat_info += f", Type: {current_type}"
-
-            if hasattr(entity, "username") and entity.username:
-                chat_info += f", Username: @{entity.username}"
-
-            # Add unread count if available
-            if hasattr(dialog, "unread_count") and dialog.unread_count > 0:
-                chat_info += f", Unread: {dialog.unread_count}"
-
-            results.append(chat_info)
+        # Filter by type if requested
+        wanted_type = chat_type.lower() if chat_type else None
+        typed_dialogs = ((dialog, get_chat_type(dialog.entity)) for dialog in dialogs)
+        output = "\n".join(
+            format_chat_line(dialog, current_type)
+            for dialog, current_type in typed_dialogs
+            if not wanted_type or current_type == wanted_type
+        )
 
-        if not results:
+        if not output:
             return f"No chats found matching the criteria."
 
-        return "\n".join(results)
+        return output
     except Exception as e:
         return log_and_format_error("list_chats", e, chat_type=chat_type, limit=limit)
 
@@ -545,7 +1046,14 @@ async def get_chat(chat_id: int) -> str:
         chat_id: The ID of the chat.
     """
     try:
-        entity = await client.get_entity(chat_id)
+        entity = await resolve_entity(chat_id)
+        reader = next_client()
+
+        # Full chat info and dialog info are independent, so fetch them together
+        lookups = [reader.get_dialogs(limit=1, offset_id=0, offset_peer=entity)]
+        if hasattr(entity, "title"):
+            lookups.append(get_full_chat(reader, entity))
+        dialog, *full_chat = await asyncio.gather(*lookups, return_exceptions=True)
 
         result = []
         result.append(f"ID: {entity.id}")
@@ -567,12 +1075,26 @@ async def get_chat(chat_id: int) -> str:
             if hasattr(entity, "username") and entity.username:
                 result.append(f"Username: @{entity.username}")
 
-            # Fetch participants count reliably
-            try:
-                participants_count = (await client.get_participants(entity, limit=0)).total
-                result.append(f"Participants: {participants_count}")
-            except Exception as pe:
-                result.append(f"Participants: Error fetching ({pe})")
+            # Participants count and description come from the full chat info
+            full_chat = full_chat[0]
+            if isinstance(full_chat, Exception):
+                result.append(f"Participants: Error fetching ({full_chat})")
+            else:
+                if is_channel:
+                    # Hidden from non-admins in some channels
+                    participants_count = full_chat.participants_count
+                else:
+                    participants = getattr(full_chat.participants, "participants", None)
+                    participants_count = (
+                        len(participants)
+                        if participants is not None
+                        else getattr(entity, "participants_count", None)
+                    )
+                result.append(
+                    f"Participants: {participants_count if participants_count is not None else 'Hidden'}"
+                )
+                if full_chat.about:
+                    result.append(f"About: {full_chat.about}")
 
         elif is_user:
             name = f"{entity.first_name}"
@@ -589,9 +1111,8 @@ async def get_chat(chat_id: int) -> str:
 
         # Get last activity if it's a dialog
         try:
-            # Using get_dialogs might be slow if there are many dialogs
-            # Alternative: Get entity again via get_dialogs if needed for unread count
-            dialog = await client.get_dialogs(limit=1, offset_id=0, offset_peer=entity)
+            if isinstance(dialog, Exception):
+                raise dialog
             if dialog:
                 dialog = dialog[0]
                 result.append(f"Unread Messages: {dialog.unread_count}")
@@ -625,48 +1146,47 @@ async def get_direct_chat_by_contact(contact_query: str) -> str:
         contact_query: Name, username, or phone number to search for.
     """
     try:
-        # Fetch all contacts using the correct Telethon method
-        result = await client(functions.contacts.GetContactsRequest(hash=0))
-        contacts = result.users
-        found_contacts = []
-        for contact in contacts:
-            if not contact:
-                continue
-            name = (
-                f"{getattr(contact, 'first_name', '')} {getattr(contact, 'last_name', '')}".strip()
+        phone_query = contact_query.replace(" ", "").replace("-", "").lstrip("+")
+        if phone_query.isdigit():
+            # contacts.Search does not reliably match phone numbers, so match them
+            # against the (hash-cached) contact list instead. Short queries can match
+            # hundreds of contacts, so keep the same 20 as the name search below to
+            # bound the GetPeerDialogs request
+            found_contacts = list(
+                itertools.islice(
+                    (
+                        user
+                        for user in await get_contacts()
+                        if user.phone and phone_query in user.phone
+                    ),
+                    20,
+                )
             )
-            username = getattr(contact, "username", "")
-            phone = getattr(contact, "phone", "")
-            if (
-                contact_query.lower() in name.lower()
-                or (username and contact_query.lower() in username.lower())
-                or (phone and contact_query in phone)
-            ):
-                found_contacts.append(contact)
+        else:
+            # Let Telegram match names and usernames server-side
+            result = await client(functions.contacts.SearchRequest(q=contact_query, limit=20))
+            # my_results are the account's own contacts; results holds global matches
+            own_peer_ids = {utils.get_peer_id(peer) for peer in result.my_results}
+            found_contacts = [
+                user
+                for user in result.users
+                if isinstance(user, User) and utils.get_peer_id(user) in own_peer_ids
+            ]
         if not found_contacts:
             return f"No contacts found matching '{contact_query}'."
-        # If we found contacts, look for direct chats with them
-        results = []
-        dialogs = await client.get_dialogs()
-        for contact in found_contacts:
-            contact_name = (
-                f"{getattr(contact, 'first_name', '')} {getattr(contact, 'last_name', '')}".strip()
-            )
-            for dialog in dialogs:
-                if isinstance(dialog.entity, User) and dialog.entity.id == contact.id:
-                    chat_info = f"Chat ID: {dialog.entity.id}, Contact: {contact_name}"
-                    if getattr(contact, "username", ""):
-                        chat_info += f", Username: @{contact.username}"
-                    if dialog.unread_count:
-                        chat_info += f", Unread: {dialog.unread_count}"
-                    results.append(chat_info)
-                    break
+        # If we found contacts, look up their direct chats in one request
+        dialogs = await get_peer_dialogs(found_contacts)
+        results = "\n".join(
+            format_direct_chat_line(contact, dialogs[contact.id])
+            for contact in found_contacts
+            if contact.id in dialogs
+        )
         if not results:
             found_names = ", ".join(
                 [f"{c.first_name} {c.last_name}".strip() for c in found_contacts]
             )
             return f"Found contacts: {found_names}, but no direct chats were found with them."
-        return "\n".join(results)
+        return results
     except Exception as e:
         return log_and_format_error("get_direct_chat_by_contact", e, contact_query=contact_query)
 
@@ -681,7 +1201,7 @@ async def get_contact_chats(contact_id: int) -> str:
     """
     try:
         # Get contact info
-        contact = await client.get_entity(contact_id)
+        contact = await resolve_entity(contact_id)
         if not isinstance(contact, User):
             return f"ID {contact_id} is not a user/contact."
 
@@ -689,31 +1209,38 @@ async def get_contact_chats(contact_id: int) -> str:
             f"{getattr(contact, 'first_name', '')} {getattr(contact, 'last_name', '')}".strip()
         )
 
-        # Find direct chat
-        direct_chat = None
-        dialogs = await client.get_dialogs()
+        # The direct-chat and common-chats lookups are independent
+        dialogs, common = await asyncio.gather(
+            get_peer_dialogs([contact]),
+            get_common_chats(contact),
+            return_exceptions=True,
+        )
+        if isinstance(dialogs, Exception):
+            raise dialogs
 
         results = []
 
         # Look for direct chat
-        for dialog in dialogs:
-            if isinstance(dialog.entity, User) and dialog.entity.id == contact_id:
-                chat_info = f"Direct Chat ID: {dialog.entity.id}, Type: Private"
-                if dialog.unread_count:
-                    chat_info += f", Unread: {dialog.unread_count}"
-                results.append(chat_info)
-                break
+        dialog = dialogs.get(contact.id)
+        if dialog is not None:
+            chat_info = f"Direct Chat ID: {contact.id}, Type: Private"
+            if dialog.unread_count:
+                chat_info += f", Unread: {dialog.unread_count}"
+            results.append(chat_info)
 
         # Look for common groups/channels
-        common_chats = []
         try:
-            common = await client.get_common_chats(contact)
+            if isinstance(common, Exception):
+                raise common
             for chat in common:
                 chat_type = "Channel" if getattr(chat, "broadcast", False) else "Group"
                 chat_info = f"Chat ID: {chat.id}, Title: {chat.title}, Type: {chat_type}"
                 results.append(chat_info)
-        except:
-            results.append("Could not retrieve common groups.")
+        except telethon.errors.rpcerrorlist.RPCError as common_err:
+            error_message = log_and_format_error(
+                "get_contact_chats", common_err, contact_id=contact_id
+            )
+            results.append(f"Could not retrieve common groups. {error_message}")
 
         if not results:
             return f"No chats found with {contact_name} (ID: {contact_id})."
@@ -733,7 +1260,7 @@ async def get_last_interaction(contact_id: int) -> str:
     """
     try:
         # Get contact info
-        contact = await client.get_entity(contact_id)
+        contact = await resolve_entity(contact_id)
         if not isinstance(contact, User):
             return f"ID {contact_id} is not a user/contact."
 
@@ -770,44 +1297,52 @@ async def get_message_context(chat_id: int, message_id: int, context_size: int =
         context_size: Number of messages before and after to include.
     """
     try:
-        chat = await client.get_entity(chat_id)
-        # Get messages around the specified message
-        messages_before = await client.get_messages(chat, limit=context_size, max_id=message_id)
-        central_message = await client.get_messages(chat, ids=message_id)
-        # Fix: get_messages(ids=...) returns a single Message, not a list
-        if central_message is not None and not isinstance(central_message, list):
-            central_message = [central_message]
-        elif central_message is None:
-            central_message = []
-        messages_after = await client.get_messages(
-            chat, limit=context_size, min_id=message_id, reverse=True
+        chat = await resolve_entity(chat_id)
+        reader = next_client()
+        # Fetch the neighbours by position rather than by ID, since IDs can have
+        # gaps: a negative add_offset makes a single history request start
+        # context_size + 1 messages above message_id
+        all_messages = list(
+            await reader.get_messages(
+                chat,
+                limit=2 * context_size + 1,
+                offset_id=message_id,
+                add_offset=-(context_size + 1),
+            )
         )
-        if not central_message:
+        if not any(m.id == message_id for m in all_messages):
             return f"Message with ID {message_id} not found in chat {chat_id}."
         # Combine messages in chronological order
-        all_messages = list(messages_before) + list(central_message) + list(messages_after)
         all_messages.sort(key=lambda m: m.id)
+
+        # Replies usually point inside the window, so only fetch the rest,
+        # all in one request instead of one per reply
+        replied_messages = {m.id: m for m in all_messages}
+        reply_ids = {get_reply_id(msg) for msg in all_messages}
+        reply_ids.discard(None)
+        reply_ids.difference_update(replied_messages)
+        if reply_ids:
+            try:
+                fetched = await reader.get_messages(chat, ids=sorted(reply_ids))
+                replied_messages.update((m.id, m) for m in fetched if m is not None)
+            except Exception as reply_err:
+                logger.warning(f"Could not fetch replied messages in {chat_id}: {reply_err}")
+
         results = [f"Context for message {message_id} in chat {chat_id}:"]
         for msg in all_messages:
             sender_name = get_sender_name(msg)
             highlight = " [THIS MESSAGE]" if msg.id == message_id else ""
 
-            # Check if this message is a reply and get the replied message
+            # Check if this message is a reply and attach the replied message
             reply_content = ""
-            if msg.reply_to and msg.reply_to.reply_to_msg_id:
-                try:
-                    replied_msg = await client.get_messages(chat, ids=msg.reply_to.reply_to_msg_id)
-                    if replied_msg:
-                        replied_sender = "Unknown"
-                        if replied_msg.sender:
-                            replied_sender = getattr(
-                                replied_msg.sender, "first_name", ""
-                            ) or getattr(replied_msg.sender, "title", "Unknown")
-                        reply_content = f" | reply to {msg.reply_to.reply_to_msg_id}\n  → Replied message: [{replied_sender}] {replied_msg.message or '[Media/No text]'}"
-                except Exception:
-                    reply_content = (
-                        f" | reply to {msg.reply_to.reply_to_msg_id} (original message not found)"
-                    )
+            reply_id = get_reply_id(msg)
+            if reply_id:
+                replied_msg = replied_messages.get(reply_id)
+                if replied_msg is not None:
+                    replied_sender = get_sender_name(replied_msg)
+                    reply_content = f" | reply to {reply_id}\n  → Replied message: [{replied_sender}] {replied_msg.message or '[Media/No text]'}"
+                else:
+                    reply_content = f" | reply to {reply_id} (original message not found)"
 
             results.append(
                 f"ID: {msg.id} | {sender_name} | {msg.date}{highlight}{reply_content}\n{msg.message or '[Media/No text]'}\n"
@@ -833,9 +1368,6 @@ async def add_contact(phone: str, first_name: str, last_name: str = "") -> str:
         last_name: The contact's last name (optional).
     """
     try:
-        # Try to import the required types first
-        from telethon.tl.types import InputPhoneContact
-
         result = await client(
             functions.contacts.ImportContactsRequest(
                 contacts=[
@@ -884,8 +1416,9 @@ async def delete_contact(user_id: int) -> str:
         user_id: The Telegram user ID of the contact to delete.
     """
     try:
-        user = await client.get_entity(user_id)
+        user = await resolve_entity(user_id)
         await client(functions.contacts.DeleteContactsRequest(id=[user]))
+        invalidate_entity(user_id)
         return f"Contact with user ID {user_id} deleted."
     except Exception as e:
         return log_and_format_error("delete_contact", e, user_id=user_id)
@@ -899,7 +1432,7 @@ async def block_user(user_id: int) -> str:
         user_id: The Telegram user ID to block.
     """
     try:
-        user = await client.get_entity(user_id)
+        user = await resolve_entity(user_id)
         await client(functions.contacts.BlockRequest(id=user))
         return f"User {user_id} blocked."
     except Exception as e:
@@ -914,7 +1447,7 @@ async def unblock_user(user_id: int) -> str:
         user_id: The Telegram user ID to unblock.
     """
     try:
-        user = await client.get_entity(user_id)
+        user = await resolve_entity(user_id)
         await client(functions.contacts.UnblockRequest(id=user))
         return f"User {user_id} unblocked."
     except Exception as e:
@@ -928,7 +1461,7 @@ async def get_me() -> str:
     """
     try:
         me = await client.get_me()
-        return json.dumps(format_entity(me), indent=2)
+        return dumps(format_entity(me))
     except Exception as e:
         return log_and_format_error("get_me", e)
 
@@ -947,7 +1480,7 @@ async def create_group(title: str, user_ids: list) -> str:
         users = []
         for user_id in user_ids:
             try:
-                user = await client.get_entity(user_id)
+                user = await resolve_entity(user_id)
                 users.append(user)
             except Exception as e:
                 logger.error(f"Failed to get entity for user ID {user_id}: {e}")
@@ -1001,15 +1534,19 @@ async def invite_to_group(group_id: int, user_ids: list) -> str:
         user_ids: List of user IDs to invite.
     """
     try:
-        entity = await client.get_entity(group_id)
-        users_to_add = []
+        entity = await resolve_entity(group_id)
 
-        for user_id in user_ids:
-            try:
-                user = await client.get_entity(user_id)
-                users_to_add.append(user)
-            except ValueError as e:
-                return f"Error: User with ID {user_id} could not be found. {e}"
+        # Resolve every user concurrently instead of one round trip at a time
+        users = await asyncio.gather(
+            *(resolve_entity(user_id) for user_id in user_ids), return_exceptions=True
+        )
+        users_to_add = []
+        for user_id, user in zip(user_ids, users):
+            if isinstance(user, ValueError):
+                return f"Error: User with ID {user_id} could not be found. {user}"
+            if isinstance(user, Exception):
+                raise user
+            users_to_add.append(user)
 
         try:
             result = await client(
@@ -1049,13 +1586,14 @@ async def leave_chat(chat_id: int) -> str:
         chat_id: The chat ID to leave.
     """
     try:
-        entity = await client.get_entity(chat_id)
+        entity = await resolve_entity(chat_id)
 
         # Check the entity type carefully
         if isinstance(entity, Channel):
             # Handle both channels and supergroups (which are also channels in Telegram)
             try:
                 await client(functions.channels.LeaveChannelRequest(channel=entity))
+                invalidate_entity(chat_id)
                 chat_name = getattr(entity, "title", str(chat_id))
                 return f"Left channel/supergroup {chat_name} (ID: {chat_id})."
             except Exception as chan_err:
@@ -1071,6 +1609,7 @@ async def leave_chat(chat_id: int) -> str:
                         chat_id=entity.id, user_id=me  # Use the entity ID directly
                     )
                 )
+                invalidate_entity(chat_id)
                 chat_name = getattr(entity, "title", str(chat_id))
                 return f"Left basic group {chat_name} (ID: {chat_id})."
             except Exception as chat_err:
@@ -1087,6 +1626,7 @@ async def leave_chat(chat_id: int) -> str:
                             chat_id=entity.id, user_id=me_full.id
                         )
                     )
+                    invalidate_entity(chat_id)
                     chat_name = getattr(entity, "title", str(chat_id))
                     return f"Left basic group {chat_name} (ID: {chat_id})."
                 except Exception as alt_err:
@@ -1127,12 +1667,7 @@ async def get_participants(chat_id: int) -> str:
         chat_id: The group or channel ID.
     """
     try:
-        participants = await client.get_participants(chat_id)
-        lines = [
-            f"ID: {p.id}, Name: {getattr(p, 'first_name', '')} {getattr(p, 'last_name', '')}"
-            for p in participants
-        ]
-        return "\n".join(lines)
+        return await format_participants(chat_id)
     except Exception as e:
         return log_and_format_error("get_participants", e, chat_id=chat_id)
 
@@ -1147,11 +1682,11 @@ async def send_file(chat_id: int, file_path: str, caption: str = None) -> str:
         caption: Optional caption for the file.
     """
     try:
-        if not os.path.isfile(file_path):
+        if not await asyncio.to_thread(os.path.isfile, file_path):
             return f"File not found: {file_path}"
-        if not os.access(file_path, os.R_OK):
+        if not await asyncio.to_thread(os.access, file_path, os.R_OK):
             return f"File is not readable: {file_path}"
-        entity = await client.get_entity(chat_id)
+        entity = await resolve_entity(chat_id)
         await client.send_file(entity, file_path, caption=caption)
         return f"File sent to chat {chat_id}."
     except Exception as e:
@@ -1170,16 +1705,16 @@ async def download_media(chat_id: int, message_id: int, file_path: str) -> str:
         file_path: Absolute path to save the downloaded file (must be writable).
     """
     try:
-        entity = await client.get_entity(chat_id)
-        msg = await client.get_messages(entity, ids=message_id)
+        # Fetching by ID only needs the input peer, which Telethon reads from its session
+        msg = await client.get_messages(chat_id, ids=message_id)
         if not msg or not msg.media:
             return "No media found in the specified message."
         # Check if directory is writable
         dir_path = os.path.dirname(file_path) or "."
-        if not os.access(dir_path, os.W_OK):
+        if not await asyncio.to_thread(os.access, dir_path, os.W_OK):
             return f"Directory not writable: {dir_path}"
         await client.download_media(msg, file=file_path)
-        if not os.path.isfile(file_path):
+        if not await asyncio.to_thread(os.path.isfile, file_path):
             return f"Download failed: file not created at {file_path}"
         return f"Media downloaded to {file_path}."
     except Exception as e:
@@ -1243,9 +1778,6 @@ async def get_privacy_settings() -> str:
     Get your privacy settings for last seen status.
     """
     try:
-        # Import needed types directly
-        from telethon.tl.types import InputPrivacyKeyStatusTimestamp
-
         try:
             settings = await client(
                 functions.account.GetPrivacyRequest(key=InputPrivacyKeyStatusTimestamp())
@@ -1274,17 +1806,6 @@ async def set_privacy_settings(
         disallow_users: List of user IDs to disallow
     """
     try:
-        # Import needed types
-        from telethon.tl.types import (
-            InputPrivacyKeyStatusTimestamp,
-            InputPrivacyKeyPhoneNumber,
-            InputPrivacyKeyProfilePhoto,
-            InputPrivacyValueAllowUsers,
-            InputPrivacyValueDisallowUsers,
-            InputPrivacyValueAllowAll,
-            InputPrivacyValueDisallowAll,
-        )
-
         # Map the simplified keys to their corresponding input types
         key_mapping = {
             "status": InputPrivacyKeyStatusTimestamp,
@@ -1311,7 +1832,7 @@ async def set_privacy_settings(
                 allow_entities = []
                 for user_id in allow_users:
                     try:
-                        user = await client.get_entity(user_id)
+                        user = await resolve_entity(user_id)
                         allow_entities.append(user)
                     except Exception as user_err:
                         logger.warning(f"Could not get entity for user ID {user_id}: {user_err}")
@@ -1328,7 +1849,7 @@ async def set_privacy_settings(
                 disallow_entities = []
                 for user_id in disallow_users:
                     try:
-                        user = await client.get_entity(user_id)
+                        user = await resolve_entity(user_id)
                         disallow_entities.append(user)
                     except Exception as user_err:
                         logger.warning(f"Could not get entity for user ID {user_id}: {user_err}")
@@ -1382,9 +1903,8 @@ async def export_contacts() -> str:
     Export all contacts as a JSON string.
     """
     try:
-        result = await client(functions.contacts.GetContactsRequest(hash=0))
-        users = result.users
-        return json.dumps([format_entity(u) for u in users], indent=2)
+        users = await get_contacts()
+        return dumps_list(map(format_entity, users))
     except Exception as e:
         return log_and_format_error("export_contacts", e)
 
@@ -1396,7 +1916,7 @@ async def get_blocked_users() -> str:
     """
     try:
         result = await client(functions.contacts.GetBlockedRequest(offset=0, limit=100))
-        return json.dumps([format_entity(u) for u in result.users], indent=2)
+        return dumps_list(map(format_entity, result.users))
     except Exception as e:
         return log_and_format_error("get_blocked_users", e)
 
@@ -1423,13 +1943,14 @@ async def edit_chat_title(chat_id: int, title: str) -> str:
     Edit the title of a chat, group, or channel.
     """
     try:
-        entity = await client.get_entity(chat_id)
+        entity = await resolve_entity(chat_id)
         if isinstance(entity, Channel):
             await client(functions.channels.EditTitleRequest(channel=entity, title=title))
         elif isinstance(entity, Chat):
             await client(functions.messages.EditChatTitleRequest(chat_id=chat_id, title=title))
         else:
             return f"Cannot edit title for this entity type ({type(entity)})."
+        invalidate_entity(chat_id)
         return f"Chat {chat_id} title updated to '{title}'."
     except Exception as e:
         logger.exception(f"edit_chat_title failed (chat_id={chat_id}, title='{title}')")
@@ -1442,12 +1963,12 @@ async def edit_chat_photo(chat_id: int, file_path: str) -> str:
     Edit the photo of a chat, group, or channel. Requires a file path to an image.
     """
     try:
-        if not os.path.isfile(file_path):
+        if not await asyncio.to_thread(os.path.isfile, file_path):
             return f"Photo file not found: {file_path}"
-        if not os.access(file_path, os.R_OK):
+        if not await asyncio.to_thread(os.access, file_path, os.R_OK):
             return f"Photo file not readable: {file_path}"
 
-        entity = await client.get_entity(chat_id)
+        entity = await resolve_entity(chat_id)
         uploaded_file = await client.upload_file(file_path)
 
         if isinstance(entity, Channel):
@@ -1463,6 +1984,7 @@ async def edit_chat_photo(chat_id: int, file_path: str) -> str:
         else:
             return f"Cannot edit photo for this entity type ({type(entity)})."
 
+        invalidate_entity(chat_id)
         return f"Chat {chat_id} photo updated."
     except Exception as e:
         logger.exception(f"edit_chat_photo failed (chat_id={chat_id}, file_path='{file_path}')")
@@ -1475,7 +1997,7 @@ async def delete_chat_photo(chat_id: int) -> str:
     Delete the photo of a chat, group, or channel.
     """
     try:
-        entity = await client.get_entity(chat_id)
+        entity = await resolve_entity(chat_id)
         if isinstance(entity, Channel):
             # Use InputChatPhotoEmpty for channels/supergroups
             await client(
@@ -1491,6 +2013,7 @@ async def delete_chat_photo(chat_id: int) -> str:
         else:
             return f"Cannot delete photo for this entity type ({type(entity)})."
 
+        invalidate_entity(chat_id)
         return f"Chat {chat_id} photo deleted."
     except Exception as e:
         logger.exception(f"delete_chat_photo failed (chat_id={chat_id})")
@@ -1508,8 +2031,8 @@ async def promote_admin(group_id: int, user_id: int, rights: dict = None) -> str
         rights: Admin rights to give (optional)
     """
     try:
-        chat = await client.get_entity(group_id)
-        user = await client.get_entity(user_id)
+        chat = await resolve_entity(group_id)
+        user = await resolve_entity(user_id)
 
         # Set default admin rights if not provided
         if not rights:
@@ -1571,8 +2094,8 @@ async def demote_admin(group_id: int, user_id: int) -> str:
         user_id: User ID to demote
     """
     try:
-        chat = await client.get_entity(group_id)
-        user = await client.get_entity(user_id)
+        chat = await resolve_entity(group_id)
+        user = await resolve_entity(user_id)
 
         # Create empty admin rights (regular user)
         admin_rights = ChatAdminRights(
@@ -1619,8 +2142,8 @@ async def ban_user(chat_id: int, user_id: int) -> str:
         user_id: User ID to ban
     """
     try:
-        chat = await client.get_entity(chat_id)
-        user = await client.get_entity(user_id)
+        chat = await resolve_entity(chat_id)
+        user = await resolve_entity(user_id)
 
         # Create banned rights (all restrictions enabled)
         banned_rights = ChatBannedRights(
@@ -1665,8 +2188,8 @@ async def unban_user(chat_id: int, user_id: int) -> str:
         user_id: User ID to unban
     """
     try:
-        chat = await client.get_entity(chat_id)
-        user = await client.get_entity(user_id)
+        chat = await resolve_entity(chat_id)
+        user = await resolve_entity(user_id)
 
         # Create unbanned rights (no restrictions)
         unbanned_rights = ChatBannedRights(
@@ -1708,12 +2231,8 @@ async def get_admins(chat_id: int) -> str:
     """
     try:
         # Fix: Use the correct filter type ChannelParticipantsAdmins
-        participants = await client.get_participants(chat_id, filter=ChannelParticipantsAdmins())
-        lines = [
-            f"ID: {p.id}, Name: {getattr(p, 'first_name', '')} {getattr(p, 'last_name', '')}".strip()
-            for p in participants
-        ]
-        return "\n".join(lines) if lines else "No admins found."
+        result = await format_participants(chat_id, filter=ChannelParticipantsAdmins())
+        return result or "No admins found."
     except Exception as e:
         logger.exception(f"get_admins failed (chat_id={chat_id})")
         return log_and_format_error("get_admins", e, chat_id=chat_id)
@@ -1726,14 +2245,8 @@ async def get_banned_users(chat_id: int) -> str:
     """
     try:
         # Fix: Use the correct filter type ChannelParticipantsKicked
-        participants = await client.get_participants(
-            chat_id, filter=ChannelParticipantsKicked(q="")
-        )
-        lines = [
-            f"ID: {p.id}, Name: {getattr(p, 'first_name', '')} {getattr(p, 'last_name', '')}".strip()
-            for p in participants
-        ]
-        return "\n".join(lines) if lines else "No banned users found."
+        result = await format_participants(chat_id, filter=ChannelParticipantsKicked(q=""))
+        return result or "No banned users found."
     except Exception as e:
         logger.exception(f"get_banned_users failed (chat_id={chat_id})")
         return log_and_format_error("get_banned_users", e, chat_id=chat_id)
@@ -1745,38 +2258,9 @@ async def get_invite_link(chat_id: int) -> str:
     Get the invite link for a group or channel.
     """
     try:
-        entity = await client.get_entity(chat_id)
-
-        # Try using ExportChatInviteRequest first
-        try:
-            from telethon.tl import functions
-
-            result = await client(functions.messages.ExportChatInviteRequest(peer=entity))
-            return result.link
-        except AttributeError:
-            # If the function doesn't exist in the current Telethon version
-            logger.warning("ExportChatInviteRequest not available, using alternative method")
-        except Exception as e1:
-            # If that fails, log and try alternative approach
-            logger.warning(f"ExportChatInviteRequest failed: {e1}")
-
-        # Alternative approach using client.export_chat_invite_link
-        try:
-            invite_link = await client.export_chat_invite_link(entity)
-            return invite_link
-        except Exception as e2:
-            logger.warning(f"export_chat_invite_link failed: {e2}")
-
-        # Last resort: Try directly fetching chat info
-        try:
-            if isinstance(entity, (Chat, Channel)):
-                full_chat = await client(functions.messages.GetFullChatRequest(chat_id=entity.id))
-                if hasattr(full_chat, "full_chat") and hasattr(full_chat.full_chat, "invite_link"):
-                    return full_chat.full_chat.invite_link or "No invite link available."
-        except Exception as e3:
-            logger.warning(f"GetFullChatRequest failed: {e3}")
-
-        return "Could not retrieve invite link for this chat."
+        entity = await resolve_entity(chat_id)
+        link = await export_invite(entity)
+        return link or "Could not retrieve invite link for this chat."
     except Exception as e:
         logger.exception(f"get_invite_link failed (chat_id={chat_id})")
         return log_and_format_error("get_invite_link", e, chat_id=chat_id)
@@ -1798,14 +2282,6 @@ async def join_chat_by_link(link: str) -> str:
 
         # Try checking the invite before joining
         try:
-            from telethon.errors import (
-                InviteHashExpiredError,
-                InviteHashInvalidError,
-                UserAlreadyParticipantError,
-                ChatAdminRequiredError,
-                UsersTooMuchError,
-            )
-
             # Try to check invite info first (will often fail if not a member)
             invite_info = await client(functions.messages.CheckChatInviteRequest(hash=hash_part))
             if hasattr(invite_info, "chat") and invite_info.chat:
@@ -1848,28 +2324,9 @@ async def export_chat_invite(chat_id: int) -> str:
     Export a chat invite link.
     """
     try:
-        entity = await client.get_entity(chat_id)
-
-        # Try using ExportChatInviteRequest first
-        try:
-            from telethon.tl import functions
-
-            result = await client(functions.messages.ExportChatInviteRequest(peer=entity))
-            return result.link
-        except AttributeError:
-            # If the function doesn't exist in the current Telethon version
-            logger.warning("ExportChatInviteRequest not available, using alternative method")
-        except Exception as e1:
-            # If that fails, log and try alternative approach
-            logger.warning(f"ExportChatInviteRequest failed: {e1}")
-
-        # Alternative approach using client.export_chat_invite_link
-        try:
-            invite_link = await client.export_chat_invite_link(entity)
-            return invite_link
-        except Exception as e2:
-            logger.warning(f"export_chat_invite_link failed: {e2}")
-            return log_and_format_error("export_chat_invite", e2, chat_id=chat_id)
+        entity = await resolve_entity(chat_id)
+        link = await export_invite(entity)
+        return link or "Could not export an invite link for this chat."
     except Exception as e:
         logger.exception(f"export_chat_invite failed (chat_id={chat_id})")
         return log_and_format_error("export_chat_invite", e, chat_id=chat_id)
@@ -1887,14 +2344,6 @@ async def import_chat_invite(hash: str) -> str:
 
         # Try checking the invite before joining
         try:
-            from telethon.errors import (
-                InviteHashExpiredError,
-                InviteHashInvalidError,
-                UserAlreadyParticipantError,
-                ChatAdminRequiredError,
-                UsersTooMuchError,
-            )
-
             # Try to check invite info first (will often fail if not a member)
             invite_info = await client(functions.messages.CheckChatInviteRequest(hash=hash))
             if hasattr(invite_info, "chat") and invite_info.chat:
@@ -1940,9 +2389,9 @@ async def send_voice(chat_id: int, file_path: str) -> str:
         file_path: Absolute path to the OGG/OPUS file.
     """
     try:
-        if not os.path.isfile(file_path):
+        if not await asyncio.to_thread(os.path.isfile, file_path):
             return f"File not found: {file_path}"
-        if not os.access(file_path, os.R_OK):
+        if not await asyncio.to_thread(os.access, file_path, os.R_OK):
             return f"File is not readable: {file_path}"
         mime, _ = mimetypes.guess_type(file_path)
         if not (
@@ -1954,7 +2403,7 @@ async def send_voice(chat_id: int, file_path: str) -> str:
             )
         ):
             return "Voice file must be .ogg or .opus format."
-        entity = await client.get_entity(chat_id)
+        entity = await resolve_entity(chat_id)
         await client.send_file(entity, file_path, voice_note=True)
         return f"Voice message sent to chat {chat_id}."
     except Exception as e:
@@ -1967,8 +2416,8 @@ async def forward_message(from_chat_id: int, message_id: int, to_chat_id: int) -
     Forward a message from one chat to another.
     """
     try:
-        from_entity = await client.get_entity(from_chat_id)
-        to_entity = await client.get_entity(to_chat_id)
+        from_entity = await resolve_entity(from_chat_id)
+        to_entity = await resolve_entity(to_chat_id)
         await client.forward_messages(to_entity, message_id, from_entity)
         return f"Message {message_id} forwarded from {from_chat_id} to {to_chat_id}."
     except Exception as e:
@@ -1987,7 +2436,7 @@ async def edit_message(chat_id: int, message_id: int, new_text: str) -> str:
     Edit a message you sent.
     """
     try:
-        entity = await client.get_entity(chat_id)
+        entity = await resolve_entity(chat_id)
         await client.edit_message(entity, message_id, new_text)
         return f"Message {message_id} edited."
     except Exception as e:
@@ -2002,7 +2451,7 @@ async def delete_message(chat_id: int, message_id: int) -> str:
     Delete a message by ID.
     """
     try:
-        entity = await client.get_entity(chat_id)
+        entity = await resolve_entity(chat_id)
         await client.delete_messages(entity, message_id)
         return f"Message {message_id} deleted."
     except Exception as e:
@@ -2015,7 +2464,7 @@ async def pin_message(chat_id: int, message_id: int) -> str:
     Pin a message in a chat.
     """
     try:
-        entity = await client.get_entity(chat_id)
+        entity = await resolve_entity(chat_id)
         await client.pin_message(entity, message_id)
         return f"Message {message_id} pinned in chat {chat_id}."
     except Exception as e:
@@ -2028,7 +2477,7 @@ async def unpin_message(chat_id: int, message_id: int) -> str:
     Unpin a message in a chat.
     """
     try:
-        entity = await client.get_entity(chat_id)
+        entity = await resolve_entity(chat_id)
         await client.unpin_message(entity, message_id)
         return f"Message {message_id} unpinned in chat {chat_id}."
     except Exception as e:
@@ -2041,7 +2490,7 @@ async def mark_as_read(chat_id: int) -> str:
     Mark all messages as read in a chat.
     """
     try:
-        entity = await client.get_entity(chat_id)
+        entity = await resolve_entity(chat_id)
         await client.send_read_acknowledge(entity)
         return f"Marked all messages as read in chat {chat_id}."
     except Exception as e:
@@ -2054,7 +2503,7 @@ async def reply_to_message(chat_id: int, message_id: int, text: str) -> str:
     Reply to a specific message in a chat.
     """
     try:
-        entity = await client.get_entity(chat_id)
+        entity = await resolve_entity(chat_id)
         await client.send_message(entity, text, reply_to=message_id)
         return f"Replied to message {message_id} in chat {chat_id}."
     except Exception as e:
@@ -2072,8 +2521,8 @@ async def get_media_info(chat_id: int, message_id: int) -> str:
         message_id: The message ID.
     """
     try:
-        entity = await client.get_entity(chat_id)
-        msg = await client.get_messages(entity, ids=message_id)
+        # Fetching by ID only needs the input peer, which Telethon reads from its session
+        msg = await client.get_messages(chat_id, ids=message_id)
         if not msg or not msg.media:
             return "No media found in the specified message."
         return str(msg.media)
@@ -2088,7 +2537,7 @@ async def search_public_chats(query: str) -> str:
     """
     try:
         result = await client(functions.contacts.SearchRequest(q=query, limit=20))
-        return json.dumps([format_entity(u) for u in result.users], indent=2)
+        return dumps_list(map(format_entity, result.users))
     except Exception as e:
         return log_and_format_error("search_public_chats", e, query=query)
 
@@ -2099,18 +2548,8 @@ async def search_messages(chat_id: int, query: str, limit: int = 20) -> str:
     Search for messages in a chat by text.
     """
     try:
-        entity = await client.get_entity(chat_id)
-        messages = await client.get_messages(entity, limit=limit, search=query)
-        lines = []
-        for msg in messages:
-            sender_name = get_sender_name(msg)
-            reply_info = ""
-            if msg.reply_to and msg.reply_to.reply_to_msg_id:
-                reply_info = f" | reply to {msg.reply_to.reply_to_msg_id}"
-            lines.append(
-                f"ID: {msg.id} | {sender_name} | Date: {msg.date}{reply_info} | Message: {msg.message}"
-            )
-        return "\n".join(lines)
+        entity = await resolve_entity(chat_id)
+        return await stream_message_lines(client.iter_messages(entity, limit=limit, search=query))
     except Exception as e:
         return log_and_format_error(
             "search_messages", e, chat_id=chat_id, query=query, limit=limit
@@ -2135,9 +2574,7 @@ async def mute_chat(chat_id: int) -> str:
     Mute notifications for a chat.
     """
     try:
-        from telethon.tl.types import InputPeerNotifySettings
-
-        peer = await client.get_entity(chat_id)
+        peer = await resolve_entity(chat_id)
         await client(
             functions.account.UpdateNotifySettingsRequest(
                 peer=peer, settings=InputPeerNotifySettings(mute_until=2**31 - 1)
@@ -2173,9 +2610,7 @@ async def unmute_chat(chat_id: int) -> str:
     Unmute notifications for a chat.
     """
     try:
-        from telethon.tl.types import InputPeerNotifySettings
-
-        peer = await client.get_entity(chat_id)
+        peer = await resolve_entity(chat_id)
         await client(
             functions.account.UpdateNotifySettingsRequest(
                 peer=peer, settings=InputPeerNotifySettings(mute_until=0)
@@ -2213,7 +2648,7 @@ async def archive_chat(chat_id: int) -> str:
     try:
         await client(
             functions.messages.ToggleDialogPinRequest(
-                peer=await client.get_entity(chat_id), pinned=True
+                peer=await resolve_entity(chat_id), pinned=True
             )
         )
         return f"Chat {chat_id} archived."
@@ -2229,7 +2664,7 @@ async def unarchive_chat(chat_id: int) -> str:
     try:
         await client(
             functions.messages.ToggleDialogPinRequest(
-                peer=await client.get_entity(chat_id), pinned=False
+                peer=await resolve_entity(chat_id), pinned=False
             )
         )
         return f"Chat {chat_id} unarchived."
@@ -2244,7 +2679,7 @@ async def get_sticker_sets() -> str:
     """
     try:
         result = await client(functions.messages.GetAllStickersRequest(hash=0))
-        return json.dumps([s.title for s in result.sets], indent=2)
+        return dumps([s.title for s in result.sets])
     except Exception as e:
         return log_and_format_error("get_sticker_sets", e)
 
@@ -2258,13 +2693,13 @@ async def send_sticker(chat_id: int, file_path: str) -> str:
         file_path: Absolute path to the .webp sticker file.
     """
     try:
-        if not os.path.isfile(file_path):
+        if not await asyncio.to_thread(os.path.isfile, file_path):
             return f"Sticker file not found: {file_path}"
-        if not os.access(file_path, os.R_OK):
+        if not await asyncio.to_thread(os.access, file_path, os.R_OK):
             return f"Sticker file is not readable: {file_path}"
         if not file_path.lower().endswith(".webp"):
             return "Sticker file must be a .webp file."
-        entity = await client.get_entity(chat_id)
+        entity = await resolve_entity(chat_id)
         await client.send_file(entity, file_path, force_document=False)
         return f"Sticker sent to chat {chat_id}."
     except Exception as e:
@@ -2287,14 +2722,10 @@ async def get_gif_search(query: str, limit: int = 10) -> str:
             )
             if not result.gifs:
                 return "[]"
-            return json.dumps(
-                [g.document.id for g in result.gifs], indent=2, default=json_serializer
-            )
+            return dumps([g.document.id for g in result.gifs])
         except (AttributeError, ImportError):
             # Fallback approach: Use SearchRequest with GIF filter
             try:
-                from telethon.tl.types import InputMessagesFilterGif
-
                 result = await client(
                     functions.messages.SearchRequest(
                         peer="gif",
@@ -2317,7 +2748,7 @@ async def get_gif_search(query: str, limit: int = 10) -> str:
                 for msg in result.messages:
                     if hasattr(msg, "media") and msg.media and hasattr(msg.media, "document"):
                         gif_ids.append(msg.media.document.id)
-                return json.dumps(gif_ids, default=json_serializer)
+                return dumps(gif_ids)
             except Exception as inner_e:
                 # Last resort: Try to fetch from a public bot
                 return f"Could not search GIFs using available methods: {inner_e}"
@@ -2337,7 +2768,7 @@ async def send_gif(chat_id: int, gif_id: int) -> str:
     try:
         if not isinstance(gif_id, int):
             return "gif_id must be a Telegram document ID (integer), not a file path. Use get_gif_search to find IDs."
-        entity = await client.get_entity(chat_id)
+        entity = await resolve_entity(chat_id)
         await client.send_file(entity, gif_id)
         return f"GIF sent to chat {chat_id}."
     except Exception as e:
@@ -2350,7 +2781,7 @@ async def get_bot_info(bot_username: str) -> str:
     Get information about a bot by username.
     """
     try:
-        entity = await client.get_entity(bot_username)
+        entity = await resolve_entity(bot_username)
         if not entity:
             return f"Bot with username {bot_username} not found."
 
@@ -2359,7 +2790,7 @@ async def get_bot_info(bot_username: str) -> str:
         # Create a more structured, serializable response
         if hasattr(result, "to_dict"):
             # Use custom serializer to handle non-serializable types
-            return json.dumps(result.to_dict(), indent=2, default=json_serializer)
+            return dumps(result.to_dict())
         else:
             # Fallback if to_dict is not available
             info = {
@@ -2375,7 +2806,7 @@ async def get_bot_info(bot_username: str) -> str:
             if hasattr(result, "full_user") and hasattr(result.full_user, "about"):
                 info["bot_info"]["about"] = result.full_user.about
 
-            return json.dumps(info, indent=2)
+            return dumps(info)
     except Exception as e:
         logger.exception(f"get_bot_info failed (bot_username={bot_username})")
         return log_and_format_error("get_bot_info", e, bot_username=bot_username)
@@ -2398,17 +2829,13 @@ async def set_bot_commands(bot_username: str, commands: list) -> str:
         if not getattr(me, "bot", False):
             return "Error: This function can only be used by bot accounts. Your current Telegram account is a regular user account, not a bot."
 
-        # Import required types
-        from telethon.tl.types import BotCommand, BotCommandScopeDefault
-        from telethon.tl.functions.bots import SetBotCommandsRequest
-
         # Create BotCommand objects from the command dictionaries
         bot_commands = [
             BotCommand(command=c["command"], description=c["description"]) for c in commands
         ]
 
         # Get the bot entity
-        bot = await client.get_entity(bot_username)
+        bot = await resolve_entity(bot_username)
 
         # Set the commands with proper scope
         await client(
@@ -2434,18 +2861,8 @@ async def get_history(chat_id: int, limit: int = 100) -> str:
     Get full chat history (up to limit).
     """
     try:
-        entity = await client.get_entity(chat_id)
-        messages = await client.get_messages(entity, limit=limit)
-        lines = []
-        for msg in messages:
-            sender_name = get_sender_name(msg)
-            reply_info = ""
-            if msg.reply_to and msg.reply_to.reply_to_msg_id:
-                reply_info = f" | reply to {msg.reply_to.reply_to_msg_id}"
-            lines.append(
-                f"ID: {msg.id} | {sender_name} | Date: {msg.date}{reply_info} | Message: {msg.message}"
-            )
-        return "\n".join(lines)
+        entity = await resolve_entity(chat_id)
+        return await stream_message_lines(client.iter_messages(entity, limit=limit))
     except Exception as e:
         return log_and_format_error("get_history", e, chat_id=chat_id, limit=limit)
 
@@ -2456,11 +2873,11 @@ async def get_user_photos(user_id: int, limit: int = 10) -> str:
     Get profile photos of a user.
     """
     try:
-        user = await client.get_entity(user_id)
+        user = await resolve_entity(user_id)
         photos = await client(
             functions.photos.GetUserPhotosRequest(user_id=user, offset=0, max_id=0, limit=limit)
         )
-        return json.dumps([p.id for p in photos.photos], indent=2)
+        return dumps([p.id for p in photos.photos])
     except Exception as e:
         return log_and_format_error("get_user_photos", e, user_id=user_id, limit=limit)
 
@@ -2471,6 +2888,7 @@ async def get_user_status(user_id: int) -> str:
     Get the online status of a user.
     """
     try:
+        # Bypass the entity cache: a cached User would carry a stale status
         user = await client.get_entity(user_id)
         return str(user.status)
     except Exception as e:
@@ -2493,57 +2911,51 @@ async def get_recent_actions(chat_id: int) -> str:
             return "No recent admin actions found."
 
         # Use the custom serializer to handle datetime objects
-        return json.dumps([e.to_dict() for e in result.events], indent=2, default=json_serializer)
+        return dumps_list(e.to_dict() for e in result.events)
     except Exception as e:
         logger.exception(f"get_recent_actions failed (chat_id={chat_id})")
         return log_and_format_error("get_recent_actions", e, chat_id=chat_id)
 
 
 @mcp.tool()
-async def get_pinned_messages(chat_id: int) -> str:
+async def get_pinned_messages(chat_id: int, limit: int = 50) -> str:
     """
-    Get all pinned messages in a chat.
+    Get pinned messages in a chat.
+
+    Args:
+        chat_id: The ID of the chat.
+        limit: Maximum number of pinned messages to return (newest first).
     """
     try:
-        entity = await client.get_entity(chat_id)
-        # Use correct filter based on Telethon version
-        try:
-            # Try newer Telethon approach
-            from telethon.tl.types import InputMessagesFilterPinned
-
-            messages = await client.get_messages(entity, filter=InputMessagesFilterPinned())
-        except (ImportError, AttributeError):
-            # Fallback - try without filter and manually filter pinned
-            all_messages = await client.get_messages(entity, limit=50)
-            messages = [m for m in all_messages if getattr(m, "pinned", False)]
-
-        if not messages:
-            return "No pinned messages found in this chat."
-
-        lines = []
-        for msg in messages:
-            sender_name = get_sender_name(msg)
-            reply_info = ""
-            if msg.reply_to and msg.reply_to.reply_to_msg_id:
-                reply_info = f" | reply to {msg.reply_to.reply_to_msg_id}"
-            lines.append(
-                f"ID: {msg.id} | {sender_name} | Date: {msg.date}{reply_info} | Message: {msg.message or '[Media/No text]'}"
-            )
-
-        return "\n".join(lines)
+        entity = await resolve_entity(chat_id)
+        # The pinned filter is applied server-side
+        result = await stream_message_lines(
+            client.iter_messages(entity, limit=limit, filter=InputMessagesFilterPinned()),
+            "[Media/No text]",
+        )
+        return result or "No pinned messages found in this chat."
     except Exception as e:
         logger.exception(f"get_pinned_messages failed (chat_id={chat_id})")
-        return log_and_format_error("get_pinned_messages", e, chat_id=chat_id)
+        return log_and_format_error("get_pinned_messages", e, chat_id=chat_id, limit=limit)
 
 
 if __name__ == "__main__":
-    nest_asyncio.apply()
 
     async def main() -> None:
         try:
             # Start the Telethon client non-interactively
             print("Starting Telegram client...")
             await client.start()
+            # Extra pooled clients share the already authorized session
+            await asyncio.gather(*(extra.connect() for extra in client_pool[1:]))
+            authorized = await asyncio.gather(
+                *(extra.is_user_authorized() for extra in client_pool[1:])
+            )
+            if not all(authorized):
+                raise RuntimeError(
+                    "Pooled Telegram clients are not authorized. "
+                    "Check TELEGRAM_SESSION_STRING or set TELEGRAM_CLIENT_POOL_SIZE=1."
+                )
 
             print("Telegram client started. Running MCP server...")
             # Use the asynchronous entrypoint instead of mcp.run()
@@ -2556,5 +2968,11 @@ if __name__ == "__main__":
                     file=sys.stderr,
                 )
             sys.exit(1)
+        finally:
+            # Pooled clients were connected by hand, so disconnect them by hand too
+            await asyncio.gather(*(extra.disconnect() for extra in client_pool[1:]))
 
-    asyncio.run(main())
+    if uvloop is not None:
+        uvloop.run(main())
+    else:
+        asyncio.run(main())